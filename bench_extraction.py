@@ -0,0 +1,141 @@
+"""
+bench_extraction.py
+
+Compare the legacy `open_url` path (whole body → `resp.text` → html2text →
+cut to budget) against `extraction.read_body` + `extraction.render` over a
+saved corpus.
+
+    python bench_extraction.py CORPUS_DIR [--fetch urls.txt] [--max-chars 4000] [--repeat 3]
+
+`--repeat` runs each path that many times per page and reports the mean.
+
+`--fetch` downloads each URL in the file into CORPUS_DIR first, keeping the
+full body whatever its type and recording its Content-Type in
+`manifest.json`, so later runs are offline and repeatable. Files saved by
+hand without a manifest entry are treated as `text/html`.
+
+Bytes columns: "legacy" is the whole body, which the old path always
+downloaded. "new" is what the capped reader keeps after the content-type
+check (0 for rejected binaries). For ordinary HTML pages under the cap the
+two match. The bandwidth saving comes only from binary responses and pages
+larger than `extraction.MAX_BYTES`.
+
+Sample run (`--repeat 5`, Python 3.11). The corpus is synthetic, built
+offline because the run had no network access. The article pages carry
+nav, 60–900 KB of inline script/style, related links and comments. There is
+also a 2.4 MB live blog, a 2 MB PDF, an RSS feed and a JSON API response.
+
+    page                      legacy ms   new ms  legacy KB   new KB
+    api.json                       16.3      0.0       75.3     75.3
+    article-long.html              26.5      6.0      330.9    330.9
+    article-medium.html            16.1      3.3      207.5    207.5
+    article-script-heavy.ht        24.8      3.9      943.6    943.6
+    article-short.html             10.0      2.2      100.4    100.4
+    feed.rss                       15.7      0.0       54.6     54.6
+    liveblog.html                 539.0     23.6     2371.5   1464.8
+    report.pdf                    143.0      0.0     1953.1      0.0
+    TOTAL                         791.3     39.1     6036.9   3177.1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import time
+from typing import Iterator, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import extraction
+
+MANIFEST = "manifest.json"
+
+
+def _chunks(data: bytes) -> Iterator[bytes]:
+    for i in range(0, len(data), extraction.CHUNK_SIZE):
+        yield data[i : i + extraction.CHUNK_SIZE]
+
+
+def _response(raw: bytes, content_type: str) -> requests.Response:
+    """Rebuild a Response so `.text` applies requests' own charset detection."""
+    resp = requests.Response()
+    resp._content = raw
+    resp._content_consumed = True
+    resp.headers = CaseInsensitiveDict({"Content-Type": content_type})
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    return resp
+
+
+def legacy(raw: bytes, content_type: str, max_chars: int) -> Tuple[str, int]:
+    return extraction.full_markdown(_response(raw, content_type).text, max_chars), len(raw)
+
+
+def budgeted(raw: bytes, content_type: str, max_chars: int) -> Tuple[str, int]:
+    try:
+        text, mime, used, truncated = extraction.read_body(content_type, _chunks(raw))
+    except extraction.ExtractionError as e:
+        return f"Error ?: {e}", 0
+    return extraction.render(text, mime, max_chars, truncated), used
+
+
+def fetch_corpus(url_file: pathlib.Path, corpus: pathlib.Path) -> None:
+    corpus.mkdir(parents=True, exist_ok=True)
+    manifest_path = corpus / MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    urls = [u.strip() for u in url_file.read_text().splitlines() if u.strip()]
+    for i, url in enumerate(urls):
+        try:
+            resp = requests.get(url, timeout=15)
+            resp.raise_for_status()
+        except Exception as e:
+            print(f"skip {url}: {e}")
+            continue
+        name = f"{i:03d}.body"
+        (corpus / name).write_bytes(resp.content)
+        manifest[name] = {"url": url, "content_type": resp.headers.get("Content-Type", "")}
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
+
+def _time(fn, repeat: int, *args) -> Tuple[float, int]:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        _, used = fn(*args)
+    return (time.perf_counter() - t0) / repeat, used
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("corpus", type=pathlib.Path)
+    parser.add_argument("--fetch", type=pathlib.Path)
+    parser.add_argument("--max-chars", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_corpus(args.fetch, args.corpus)
+
+    manifest_path = args.corpus / MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    pages = sorted(p for p in args.corpus.iterdir() if p.is_file() and p.name != MANIFEST)
+    if not pages:
+        raise SystemExit(f"No saved pages in {args.corpus}")
+
+    totals = [0.0, 0.0, 0, 0]
+    print(f"{'page':<24}{'legacy ms':>11}{'new ms':>9}{'legacy KB':>11}{'new KB':>9}")
+    for page in pages:
+        raw = page.read_bytes()
+        content_type = manifest.get(page.name, {}).get("content_type", "text/html")
+        t_legacy, b_legacy = _time(legacy, args.repeat, raw, content_type, args.max_chars)
+        t_new, b_new = _time(budgeted, args.repeat, raw, content_type, args.max_chars)
+        row = [t_legacy, t_new, b_legacy, b_new]
+        totals = [a + b for a, b in zip(totals, row)]
+        print(f"{page.name[:23]:<24}{row[0] * 1e3:>11.1f}{row[1] * 1e3:>9.1f}"
+              f"{row[2] / 1024:>11.1f}{row[3] / 1024:>9.1f}")
+
+    print(f"{'TOTAL':<24}{totals[0] * 1e3:>11.1f}{totals[1] * 1e3:>9.1f}"
+          f"{totals[2] / 1024:>11.1f}{totals[3] / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
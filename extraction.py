@@ -0,0 +1,550 @@
+"""
+extraction.py
+
+Budgeted main‑content extraction used by the `open_url` tool.
+
+The response is streamed with a hard byte cap, rejected early if it is
+binary, decoded with the declared (or sniffed) charset, reduced to its
+article body with readability‑style density scoring, and converted to
+Markdown block by block until the character budget is spent.
+"""
+from __future__ import annotations
+
+import codecs
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from html import escape
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional, Tuple, Union
+
+import html2text
+import requests
+
+# ---------------------------------------------------------------------------
+#  LIMITS & TAG TABLES
+# ---------------------------------------------------------------------------
+MAX_BYTES = 1_500_000  # stop downloading past this many bytes
+CHUNK_SIZE = 16_384
+SNIFF_BYTES = 2048  # how far into the body to look for <meta charset>
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+# Anything else is returned as plain text unless it is known to be binary.
+BINARY_PREFIXES = ("image/", "audio/", "video/", "font/", "application/vnd.ms-",
+                   "application/vnd.openxmlformats")
+BINARY_TYPES = {
+    "application/pdf", "application/octet-stream", "application/zip",
+    "application/gzip", "application/x-gzip", "application/x-tar",
+    "application/x-7z-compressed", "application/x-rar-compressed",
+    "application/msword", "application/wasm",
+}
+
+# Subtrees dropped entirely while parsing. <form> is kept: WebForms/CMS
+# sites wrap the whole page in one, so only the controls themselves go.
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "object", "embed", "button", "select", "textarea", "input",
+    "nav", "footer", "title",
+}
+# Anything else opening inside <head> implies </head> (which minifiers omit).
+HEAD_TAGS = {"title", "meta", "link", "base", "script", "style", "noscript", "template"}
+# Dropped before scoring unless their class/id looks like content.
+UNLIKELY_TAGS = {"aside"}
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+}
+# Opening one of these implicitly closes an open <p> (HTML5 "close a p element").
+CLOSES_P = {
+    "address", "article", "aside", "blockquote", "details", "div", "dl",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3",
+    "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+    "section", "table", "ul", "dd", "dt",
+}
+# tag -> (open elements it implicitly closes, ancestors that stop the search)
+IMPLIED_END = {
+    "li": ({"li"}, {"ul", "ol", "menu"}),
+    "dt": ({"dt", "dd"}, {"dl"}),
+    "dd": ({"dt", "dd"}, {"dl"}),
+    "tr": ({"tr", "td", "th"}, {"table", "thead", "tbody", "tfoot"}),
+    "td": ({"td", "th"}, {"tr", "table"}),
+    "th": ({"td", "th"}, {"tr", "table"}),
+    "tbody": ({"thead", "tbody", "tfoot", "tr", "td", "th"}, {"table"}),
+    "tfoot": ({"thead", "tbody", "tfoot", "tr", "td", "th"}, {"table"}),
+    "option": ({"option"}, {"select", "datalist"}),
+}
+P_SCOPE = {"button", "table", "td", "th", "caption", "html", "template", "object"}
+# Wrappers that `_flatten` may unroll, and everything it treats as a block.
+CONTAINER_TAGS = {"div", "section", "article", "main", "header", "form", "body", "html", "#root"}
+BLOCK_TAGS = CONTAINER_TAGS | {
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "dl", "table",
+    "blockquote", "pre", "figure", "hr", "address", "details", "fieldset",
+}
+# Tags whose text counts towards a parent's content score.
+SCORE_TAGS = {"p", "pre", "td", "blockquote"}
+
+UNLIKELY_RE = re.compile(
+    r"banner|breadcrumb|combx|comment|community|cookie|disqus|extra|footer|"
+    r"header|legends|menu|modal|nav|newsletter|outbrain|pager|popup|promo|"
+    r"related|remark|replies|rss|share|shoutbox|sidebar|skyscraper|social|"
+    r"sponsor|subscribe|taboola|tags|tool|widget",
+    re.I,
+)
+MAYBE_RE = re.compile(r"and|article|body|column|content|main|shadow", re.I)
+POSITIVE_RE = re.compile(
+    r"article|body|content|entry|hentry|h-entry|main|page|post|story|text",
+    re.I,
+)
+NEGATIVE_RE = re.compile(
+    r"-ad-|ad-break|byline|caption|comment|com-|contact|footer|footnote|"
+    r"masthead|media|meta|outbrain|promo|related|scroll|share|shoutbox|"
+    r"sidebar|skyscraper|sponsor|shopping|tags|tool|widget",
+    re.I,
+)
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w.:-]+)""", re.I)
+
+
+class ExtractionError(Exception):
+    """Raised when a response cannot be turned into readable text."""
+
+
+# ---------------------------------------------------------------------------
+#  MINIMAL DOM
+# ---------------------------------------------------------------------------
+@dataclass(eq=False)
+class Node:
+    tag: str
+    attrs: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+    parent: Optional["Node"] = None
+    children: List[Union["Node", str]] = field(default_factory=list)
+    score: float = 0.0
+    scored: bool = False
+    text_len: int = 0  # filled in by `_measure`
+    link_len: int = 0
+
+    def text(self) -> str:
+        return "".join(c for n in self.iter() for c in n.children if isinstance(c, str))
+
+    def iter(self):
+        """Pre‑order walk; iterative so tag soup of any depth is safe."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed([c for c in node.children if isinstance(c, Node)]))
+
+    def _open_tag(self) -> str:
+        attrs = "".join(
+            f' {k}="{escape(v)}"' if v is not None else f" {k}"
+            for k, v in self.attrs
+            if k in ("href", "src", "alt", "title")
+        )
+        return f"<{self.tag}{attrs}>"
+
+    def to_html(self) -> str:
+        out: List[str] = []
+        stack: List[Union[Node, str]] = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                out.append(item)
+                continue
+            out.append(item._open_tag())
+            if item.tag in VOID_TAGS:
+                continue
+            stack.append(f"</{item.tag}>")
+            stack.extend(
+                reversed([escape(c, quote=False) if isinstance(c, str) else c for c in item.children])
+            )
+        return "".join(out)
+
+
+class _TreeBuilder(HTMLParser):
+    """Forgiving HTML → `Node` tree, skipping boilerplate subtrees as it goes."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#root")
+        self.cur = self.root
+        self.skip_depth = 0
+        self.skip_tag = None
+        self.open_tags = Counter()  # open elements by tag, so lookups skip the walk
+        self.title_parts: List[str] = []
+        self.title_done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
+            return
+        if self.open_tags["head"] and tag not in HEAD_TAGS:
+            self._close_implied({"head"}, ())
+        if tag in CLOSES_P:
+            self._close_implied({"p"}, P_SCOPE)
+        if tag in IMPLIED_END:
+            self._close_implied(*IMPLIED_END[tag])
+        if tag in SKIP_TAGS:
+            if tag not in VOID_TAGS:
+                self.skip_tag, self.skip_depth = tag, 1
+            return
+        node = Node(tag, attrs, self.cur)
+        self.cur.children.append(node)
+        if tag not in VOID_TAGS:
+            self.cur = node
+            self.open_tags[tag] += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.skip_depth and tag not in SKIP_TAGS:
+            self.cur.children.append(Node(tag, attrs, self.cur))
+
+    def handle_endtag(self, tag):
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+                self.title_done |= tag == "title" and not self.skip_depth
+            return
+        # Walk up to the matching open element; ignore stray end tags.
+        if not self.open_tags[tag]:
+            return
+        node = self.cur
+        while node.tag != tag:
+            node = node.parent
+        self._pop_to(node)
+
+    def _close_implied(self, closes, boundary):
+        """Pop out of the outermost open element in *closes* below *boundary*."""
+        if not any(self.open_tags[t] for t in closes):
+            return
+        node, target = self.cur, None
+        while node is not self.root and node.tag not in boundary:
+            if node.tag in closes:
+                target = node
+            node = node.parent
+        if target is not None:
+            self._pop_to(target)
+
+    def _pop_to(self, target: Node) -> None:
+        """Close every open element from the current one up to *target*."""
+        while True:
+            node, self.cur = self.cur, self.cur.parent
+            self.open_tags[node.tag] -= 1
+            if node is target:
+                return
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.cur.children.append(data)
+        elif self.skip_tag == "title" and not self.title_done:
+            self.title_parts.append(data)
+
+    @property
+    def title(self) -> str:
+        return re.sub(r"\s+", " ", "".join(self.title_parts)).strip()
+
+
+# ---------------------------------------------------------------------------
+#  STREAMING FETCH
+# ---------------------------------------------------------------------------
+def read_capped(chunks: Iterable[bytes], max_bytes: int = MAX_BYTES) -> Tuple[bytes, bool]:
+    """Join *chunks* until *max_bytes* is reached. Returns (body, truncated)."""
+    buf = bytearray()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        room = max_bytes - len(buf)
+        if len(chunk) >= room:
+            buf += chunk[:room]
+            return bytes(buf), True
+        buf += chunk
+    return bytes(buf), False
+
+
+def sniff_charset(head: bytes, declared: Optional[str]) -> str:
+    """Pick a codec from the header, a BOM or a <meta charset>, else UTF‑8."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    candidates = [declared]
+    m = META_CHARSET_RE.search(head[:SNIFF_BYTES])
+    if m:
+        candidates.append(m.group(1).decode("ascii", "ignore"))
+    for name in candidates:
+        if not name:
+            continue
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+def _parse_content_type(header: str) -> Tuple[str, Optional[str]]:
+    mime, _, params = header.partition(";")
+    charset = None
+    for param in params.split(";"):
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            charset = value.strip().strip("\"'") or None
+    return mime.strip().lower(), charset
+
+
+def is_binary_type(mime: str) -> bool:
+    return mime in BINARY_TYPES or mime.startswith(BINARY_PREFIXES)
+
+
+def read_body(
+    content_type: str, chunks: Iterable[bytes], max_bytes: int = MAX_BYTES
+) -> Tuple[str, str, int, bool]:
+    """Check *content_type*, then read *chunks* up to *max_bytes* and decode.
+
+    Returns (decoded_text, mime, bytes_read, truncated). Binary types are
+    rejected before a single body chunk is pulled.
+    """
+    mime, charset = _parse_content_type(content_type)
+    if is_binary_type(mime):
+        raise ExtractionError(f"unsupported content type {mime}")
+    body, truncated = read_capped(chunks, max_bytes)
+    # Headers may be missing or lie; a NUL in the head is a safe binary tell.
+    if b"\x00" in body[:SNIFF_BYTES] and not body.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        raise ExtractionError("binary response body")
+    text = body.decode(sniff_charset(body, charset), errors="replace")
+    return text, mime or "text/html", len(body), truncated
+
+
+def fetch(url: str, max_bytes: int = MAX_BYTES, timeout: int = 15) -> Tuple[str, str, bool]:
+    """Stream *url* and return (decoded_text, mime, truncated). Raises on binary bodies."""
+    with requests.get(url, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        text, mime, _, truncated = read_body(
+            resp.headers.get("Content-Type", ""), resp.iter_content(CHUNK_SIZE), max_bytes
+        )
+    return text, mime, truncated
+
+
+# ---------------------------------------------------------------------------
+#  READABILITY‑STYLE SCORING
+# ---------------------------------------------------------------------------
+def _class_id(node: Node) -> str:
+    return " ".join(v or "" for k, v in node.attrs if k in ("class", "id"))
+
+
+def _class_weight(node: Node) -> int:
+    label = _class_id(node)
+    if not label:
+        return 0
+    weight = 0
+    if NEGATIVE_RE.search(label):
+        weight -= 25
+    if POSITIVE_RE.search(label):
+        weight += 25
+    return weight
+
+
+def _init_score(node: Node) -> None:
+    base = {
+        "div": 5, "article": 10, "main": 5, "section": 3,
+        "pre": 3, "td": 3, "blockquote": 3,
+        "address": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3,
+        "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5,
+    }.get(node.tag, 0)
+    node.score = base + _class_weight(node)
+    node.scored = True
+
+
+def _measure(root: Node) -> None:
+    """Fill `text_len`/`link_len` for every node in one bottom‑up pass."""
+    for node in reversed(list(root.iter())):
+        text_len = link_len = 0
+        for child in node.children:
+            if isinstance(child, str):
+                text_len += len(child)
+            else:
+                text_len += child.text_len
+                link_len += child.link_len
+        node.text_len = text_len
+        node.link_len = text_len if node.tag == "a" else link_len
+
+
+def _link_density(node: Node) -> float:
+    return node.link_len / node.text_len if node.text_len else 0.0
+
+
+def _prune_unlikely(root: Node) -> None:
+    for node in list(root.iter()):
+        if node.tag in ("html", "body", "article", "main", "#root"):
+            continue
+        label = _class_id(node)
+        if MAYBE_RE.search(label):
+            continue
+        if node.tag in UNLIKELY_TAGS or UNLIKELY_RE.search(label):
+            node.parent.children = [c for c in node.parent.children if c is not node]
+
+
+def _top_candidate(root: Node) -> Optional[Node]:
+    candidates: List[Node] = []
+    for node in root.iter():
+        if node.tag not in SCORE_TAGS or node.parent is None:
+            continue
+        text = node.text().strip()
+        if len(text) < 25:
+            continue
+        content_score = 1 + text.count(",") + min(len(text) // 100, 3)
+        ancestor, level = node.parent, 0
+        while ancestor is not None and ancestor.tag != "#root" and level < 3:
+            if not ancestor.scored:
+                _init_score(ancestor)
+                candidates.append(ancestor)
+            divider = 1 if level == 0 else 2 if level == 1 else level * 3
+            ancestor.score += content_score / divider
+            ancestor, level = ancestor.parent, level + 1
+    if not candidates:
+        return None
+    for node in candidates:
+        node.score *= 1 - _link_density(node)
+    return max(candidates, key=lambda n: n.score)
+
+
+def _article_blocks(top: Node) -> List[Node]:
+    """Return *top* plus siblings that look like continuations of the article."""
+    parent = top.parent
+    if parent is None or parent.tag == "#root":
+        return [top]
+    threshold = max(10.0, top.score * 0.2)
+    top_label = _class_id(top)
+    blocks = []
+    for sib in parent.children:
+        if not isinstance(sib, Node):
+            continue
+        if sib is top:
+            blocks.append(sib)
+            continue
+        bonus = top.score * 0.2 if top_label and _class_id(sib) == top_label else 0
+        if sib.scored and sib.score + bonus >= threshold:
+            blocks.append(sib)
+        elif sib.tag == "p":
+            text = sib.text().strip()
+            density = _link_density(sib)
+            if (len(text) > 80 and density < 0.25) or (
+                0 < len(text) <= 80 and density == 0 and re.search(r"\.( |$)", text)
+            ):
+                blocks.append(sib)
+    return blocks
+
+
+def main_content(html: str) -> Tuple[List[Node], str]:
+    """Parse *html* and return (article body block nodes, page title)."""
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    root = builder.root
+    _prune_unlikely(root)
+    _measure(root)
+    top = _top_candidate(root)
+    if top is None:
+        body = next((n for n in root.iter() if n.tag == "body"), root)
+        return [body], builder.title
+    return _article_blocks(top), builder.title
+
+
+# ---------------------------------------------------------------------------
+#  BUDGETED MARKDOWN
+# ---------------------------------------------------------------------------
+def _has_content(loose: List[Union[Node, str]]) -> bool:
+    return any(isinstance(c, Node) or c.strip() for c in loose)
+
+
+def _flatten(blocks: List[Node]) -> Iterable[Node]:
+    """Yield convertible units: containers with block children are unrolled,
+    runs of inline nodes and bare text are grouped into one <p>."""
+    stack = [(iter(blocks), [])]
+    while stack:
+        children, loose = stack[-1]
+        child = next(children, None)
+        if child is None:
+            if _has_content(loose):
+                yield Node("p", children=list(loose))
+            stack.pop()
+            continue
+        if not (isinstance(child, Node) and child.tag in BLOCK_TAGS):
+            loose.append(child)
+            continue
+        if _has_content(loose):
+            yield Node("p", children=list(loose))
+        loose.clear()
+        if child.tag in CONTAINER_TAGS and any(
+            isinstance(c, Node) and c.tag in BLOCK_TAGS for c in child.children
+        ):
+            stack.append((iter(child.children), []))
+        else:
+            yield child
+
+
+def to_markdown(blocks: List[Node], max_chars: int) -> Tuple[str, bool]:
+    """Convert *blocks* to Markdown, stopping once *max_chars* is filled."""
+    conv = html2text.HTML2Text()
+    conv.ignore_links = False
+    conv.body_width = 0
+    parts: List[str] = []
+    used = 0
+    for unit in _flatten(blocks):
+        # Only strip newlines in front: list items carry a leading indent.
+        md = conv.handle(unit.to_html()).rstrip().lstrip("\n")
+        if not md:
+            continue
+        parts.append(md)
+        used += len(md) + 2
+        if used > max_chars:
+            return "\n\n".join(parts)[:max_chars], True
+    return "\n\n".join(parts), False
+
+
+def _clip(text: str, max_chars: int) -> str:
+    """Cut *text* to *max_chars*, marking the cut with " …" inside the budget."""
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 2:
+        return text[:max(max_chars, 0)]
+    return text[: max_chars - 2].rstrip() + " …"
+
+
+def extract(html: str, max_chars: int) -> str:
+    """Return budgeted Markdown for the main content of *html* ("" if none)."""
+    blocks, title = main_content(html)
+    head = f"# {title}\n\n" if title else ""
+    if len(head) * 2 > max_chars:
+        head = ""
+    md, truncated = to_markdown(blocks, max(max_chars - len(head) - 2, 0))
+    if not md.strip():
+        return ""
+    if head and title not in md[: len(title) + 200]:
+        md = head + md
+    return _clip(md + " …" if truncated else md, max_chars)
+
+
+def full_markdown(html: str, max_chars: int) -> str:
+    """Legacy conversion: the whole page through html2text, cut to *max_chars*."""
+    conv = html2text.HTML2Text()
+    conv.ignore_links = False
+    md = conv.handle(html)
+    return md[:max_chars] + " …" if len(md) > max_chars else md
+
+
+def render(text: str, mime: str, max_chars: int, truncated: bool = False) -> str:
+    """Turn a fetched body into tool output, noting a body cut off at the byte cap."""
+    note = f"\n\n[page truncated at {MAX_BYTES / 1e6:g} MB]" if truncated else ""
+    if len(note) * 2 > max_chars:
+        note = ""
+    return _render(text, mime, max_chars - len(note)) + note
+
+
+def _render(text: str, mime: str, max_chars: int) -> str:
+    """Budgeted output for *text*, falling back to `full_markdown`."""
+    if mime not in HTML_TYPES:
+        return _clip(text, max_chars)
+    try:
+        md = extract(text, max_chars)
+    except Exception as e:
+        print(f"Main‑content extraction failed → full conversion … ({e})")
+        md = ""
+    return md if md.strip() else _clip(full_markdown(text, max_chars), max_chars)
@@ -14,7 +14,6 @@ import os
 import time
 from typing import List, Dict, Optional, Tuple
 
-import html2text
 import openai
 import requests
 from dotenv import load_dotenv
@@ -24,6 +23,7 @@ from duckduckgo_search.exceptions import (
 )
 from dataclasses import dataclass
 import db
+import extraction
 
 # ---------------------------------------------------------------------------
 #  ENV & GLOBAL CLIENT SETUP
@@ -34,9 +34,6 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 # ---------------------------------------------------------------------------
 #  UTILITIES
 # ---------------------------------------------------------------------------
-html2md = html2text.HTML2Text()
-html2md.ignore_links = False  # Keep hyperlinks
-
 DDGS_RATE_LIMIT_SLEEP = 60  # seconds
 
 
@@ -71,18 +68,14 @@ def search_web(query: str, num_results: int = 5) -> List[Dict[str, str]]:
 
 
 def open_url(url: str, max_chars: int = 4000) -> Dict[str, str]:
-    """Fetch *url* and return a Markdown version (truncated to *max_chars*)."""
+    """Fetch *url* and return Markdown of its main content (budgeted to *max_chars*)."""
     try:
-        resp = requests.get(url, timeout=15)
-        resp.raise_for_status()
+        text, mime, truncated = extraction.fetch(url)
+        md = extraction.render(text, mime, max_chars, truncated)
+    except requests.HTTPError as e:
+        return {"url": url, "markdown": f"Error {e.response.status_code}: {e.response.reason or e}"}
     except Exception as e:
-        status = getattr(resp, "status_code", "?") if "resp" in locals() else "?"
-        reason = getattr(resp, "reason", "") if "resp" in locals() else ""
-        return {"url": url, "markdown": f"Error {status}: {reason or e}"}
-
-    md = html2md.handle(resp.text)
-    if len(md) > max_chars:
-        md = md[: max_chars] + " …"
+        return {"url": url, "markdown": f"Error ?: {e}"}
     return {"url": url, "markdown": md}
 
 
@@ -0,0 +1,146 @@
+import codecs
+import time
+
+import pytest
+
+import extraction
+
+PARA = "<p>The council voted, after a long debate, to approve the new budget for schools, roads and parks.</p>"
+
+
+# ---------------------------------------------------------------------------
+#  STREAMING / HEADERS
+# ---------------------------------------------------------------------------
+def test_read_capped_truncates_mid_chunk():
+    body, truncated = extraction.read_capped(iter([b"abc", b"", b"defg", b"hij"]), max_bytes=5)
+    assert body == b"abcde"
+    assert truncated
+
+
+def test_read_capped_under_limit():
+    body, truncated = extraction.read_capped(iter([b"abc", b"def"]), max_bytes=100)
+    assert body == b"abcdef"
+    assert not truncated
+
+
+def test_sniff_charset_prefers_header():
+    head = b'<meta charset="iso-8859-1"><p>x'
+    assert extraction.sniff_charset(head, "windows-1252") == "cp1252"
+
+
+def test_sniff_charset_bom_beats_header():
+    assert extraction.sniff_charset(codecs.BOM_UTF8 + b"<p>x", "iso-8859-1") == "utf-8-sig"
+
+
+def test_read_body_decodes_utf16_bom():
+    raw = "<html><p>café</p></html>".encode("utf-16")  # native order, with BOM
+    for bom_raw in (raw, codecs.BOM_UTF16_BE + "<p>café</p>".encode("utf-16-be")):
+        text, _, _, _ = extraction.read_body("text/html; charset=utf-8", iter([bom_raw]))
+        assert "café</p>" in text and "\x00" not in text
+
+
+def test_sniff_charset_meta_then_default():
+    assert extraction.sniff_charset(b"<meta charset='ISO-8859-1'>", None) == "iso8859-1"
+    assert extraction.sniff_charset(b'<meta content="text/html; charset=bogus">', "nope") == "utf-8"
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("text/html; charset=UTF-8", ("text/html", "UTF-8")),
+    ('Text/HTML;Charset="iso-8859-1"', ("text/html", "iso-8859-1")),
+    ("application/json", ("application/json", None)),
+    ("", ("", None)),
+])
+def test_parse_content_type(header, expected):
+    assert extraction._parse_content_type(header) == expected
+
+
+def test_read_body_rejects_binary_before_reading():
+    def chunks():
+        raise AssertionError("body should not be read")
+        yield b""
+
+    with pytest.raises(extraction.ExtractionError):
+        extraction.read_body("application/pdf", chunks())
+
+
+def test_read_body_passes_json_as_text():
+    text, mime, used, truncated = extraction.read_body("application/json", iter([b'{"a": 1}']))
+    assert (text, mime, used, truncated) == ('{"a": 1}', "application/json", 8, False)
+    assert extraction.render(text, mime, 4000) == '{"a": 1}'
+
+
+# ---------------------------------------------------------------------------
+#  EXTRACTION
+# ---------------------------------------------------------------------------
+def test_extract_unclosed_paragraphs():
+    html = "<body><div>" + PARA.replace("</p>", "") * 400 + "</div></body>"
+    md = extraction.extract(html, 4000)
+    assert md.startswith("The council voted")
+    assert "\n\nThe council voted" in md
+    assert len(md) <= 4000
+
+
+def test_extract_deep_nesting_is_linear():
+    html = "<body>" + ("<div>" + PARA) * 3000 + "</body>"
+    start = time.perf_counter()
+    md = extraction.extract(html, 4000)
+    assert time.perf_counter() - start < 2.0
+    assert "The council voted" in md
+
+
+def test_extract_with_omitted_head_end_tag():
+    html = f"<html><head><title>Budget</title><meta charset=utf-8><body><div>{PARA}</div></body>"
+    assert "The council voted" in extraction.extract(html, 4000)
+
+
+def test_extract_title_is_unescaped_and_found_late():
+    filler = "<meta name='x' content='y'>" * 2000
+    html = f"<html><head>{filler}<title>Tom &amp; Jerry</title></head><body><div>{PARA}</div></body>"
+    assert extraction.extract(html, 4000).startswith("# Tom & Jerry\n\nThe council voted")
+
+
+def test_extract_form_wrapped_page():
+    html = (
+        "<body><form id='aspnetForm'><div class='article'>"
+        f"{PARA}{PARA}</div><input name='q'></form></body>"
+    )
+    assert extraction.extract(html, 4000).count("The council voted") == 2
+
+
+def test_extract_keeps_inline_markup_in_one_paragraph():
+    html = (
+        "<body><div class='content'>Hello <a href='/x'>link</a> world, and some, "
+        "more words to score. <b>bold</b> more.</div></body>"
+    )
+    assert extraction.extract(html, 4000) == "Hello [link](/x) world, and some, more words to score. **bold** more."
+
+
+def test_extract_drops_boilerplate():
+    html = (
+        "<body><nav><a href='/'>Home</a></nav>"
+        "<div class='sidebar'><p>Subscribe to our newsletter, today, for all the news.</p></div>"
+        f"<div class='story'>{PARA * 3}</div><footer>(c) 2025</footer></body>"
+    )
+    md = extraction.extract(html, 4000)
+    assert "Subscribe" not in md and "Home" not in md and "(c)" not in md
+
+
+def test_extract_keeps_list_items_aligned():
+    html = f"<body><div class='story'>{PARA}<ul><li>one</li><li>two</li></ul>{PARA}</div></body>"
+    assert "\n\n  * one\n  * two\n\n" in extraction.extract(html, 4000)
+
+
+def test_render_notes_truncated_body():
+    html = f"<body><div>{PARA * 3}</div></body>"
+    text, mime, _, truncated = extraction.read_body("text/html", iter([html.encode()]), max_bytes=200)
+    assert truncated
+    md = extraction.render(text, mime, 4000, truncated)
+    assert md.startswith("The council voted") and md.endswith("[page truncated at 1.5 MB]")
+    assert not extraction.render(text, mime, 4000).endswith("MB]")
+
+
+@pytest.mark.parametrize("max_chars", [0, 5, 20, 60, 300])
+def test_render_respects_budget(max_chars):
+    html = f"<title>A rather long headline about the budget</title><body>{PARA * 20}</body>"
+    assert len(extraction.render(html, "text/html", max_chars)) <= max_chars
+    assert len(extraction.render(html, "text/html", max_chars, truncated=True)) <= max_chars